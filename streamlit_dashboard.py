@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import numpy as np
-from collections import Counter
+import plotly.graph_objects as go
+import os
+import glob
+import hashlib
+import inspect
+import tempfile
+from contextlib import suppress
 
 # Set Streamlit page configuration
 st.set_page_config(
@@ -11,127 +16,283 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Shared layout for every pie chart, so each chart only adds its own trace and title
+PIE_LAYOUT = dict(
+    piecolorway=px.colors.qualitative.D3,
+    legend=dict(tracegroupgap=0)
+)
+
 # --- 1. Load Data Function ---
-@st.cache_data
 def load_data(file_path):
-    """Loads the CSV data."""
+    """Loads the CSV data into Arrow-backed columns."""
     try:
-        df = pd.read_csv(file_path)
+        df = pd.read_csv(file_path, engine='pyarrow', dtype_backend='pyarrow')
         return df
     except FileNotFoundError:
         st.error(f"Error: The data file '{file_path}' was not found in the repository. Please ensure it is uploaded.")
         return pd.DataFrame()
 
 # --- 2. Data Cleaning and Preparation (Includes Album Consolidation) ---
-@st.cache_data
 def prepare_data(df):
     """Cleans up and prepares data for visualization, including album consolidation."""
     if df.empty:
         return df
 
     # Replace empty strings/whitespace with NaN for accurate non-empty counting
-    df = df.replace(r'^\s*$', np.nan, regex=True)
-    
-    # Standardize 'combined_key'
-    for col in ['combined_key', 'album_title']:
-        if col in df.columns:
-            df[col] = df[col].replace(r'^\s*$', np.nan, regex=True)
-
-    # Convert counts to integer
+    # (numeric columns can't hold whitespace, so only the text columns are scanned)
+    text_cols = [col for col in df.columns if pd.api.types.is_string_dtype(df[col])]
+    for col in text_cols:
+        df[col] = df[col].mask(df[col].str.strip() == '')
+
+    # Convert counts to plain floats (NaN marks a missing count), which keeps
+    # sorting and nlargest on NumPy's fast paths. float32 would round view counts
+    # above 2**24, so float64 is used
     for col in ['viewCount', 'likeCount', 'commentCount', 'popularity']:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            df[col] = df[col].astype('Int64', errors='ignore')
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
             
     # --- ALBUM CONSOLIDATION LOGIC ---
     if 'album_title' in df.columns:
         non_null_albums = df['album_title'].dropna().astype(str)
+        unique_titles = non_null_albums.drop_duplicates().reset_index(drop=True)
         
-        # 1. Global Sub-content Frequency Count
-        all_sub_contents = []
-        for title in non_null_albums.unique():
-            parts = [part.strip() for part in title.split('|')]
-            valid_parts = [part for part in parts if part]
-            all_sub_contents.extend(valid_parts)
-        sub_content_counts = Counter(all_sub_contents)
+        # 1. Global Sub-content Frequency Count (one row per sub-content, indexed by title)
+        parts = unique_titles.str.split('|').explode().str.strip()
+        parts = parts[parts.notna() & (parts != '')]
+        sub_content_counts = parts.value_counts()
 
         # 2. Create Mapping
-        title_mapping = {}
-        for original_title in non_null_albums.unique():
-            sub_contents = [part.strip() for part in original_title.split('|')]
-            valid_sub_contents = [part for part in sub_contents if part]
-            
-            if valid_sub_contents:
-                # Find the sub-content with the highest global frequency count
-                consolidated_title = max(valid_sub_contents, key=lambda x: sub_content_counts[x])
-            else:
-                consolidated_title = original_title 
-            title_mapping[original_title] = consolidated_title
+        # Pick the sub-content with the highest global frequency count; the stable
+        # sort keeps the first of tied sub-contents, matching max() on the split list
+        parts_df = parts.to_frame('part')
+        parts_df['freq'] = parts_df['part'].map(sub_content_counts)
+        winners = parts_df.sort_values('freq', ascending=False, kind='stable') \
+            .groupby(level=0)['part'] \
+            .first()
+        # Titles without any non-empty sub-content keep their original value
+        consolidated = winners.reindex(unique_titles.index).fillna(unique_titles)
+        title_mapping = dict(zip(unique_titles, consolidated))
 
         # 3. Apply Mapping
         df['consolidated_album_title'] = df['album_title'].map(title_mapping)
     # --- END ALBUM CONSOLIDATION ---
 
+    # Store the low-cardinality label columns as categoricals so counting and
+    # filtering run on integer codes instead of Python strings
+    cat_cols = [
+        col for col in df.columns
+        if col.startswith(('mood_', 'ai_')) and col not in ('ai_notes', 'lyrics_text')
+    ]
+    cat_cols += ['super_theme', 'genre_ros', 'timbre', 'danceability', 'combined_key']
+    # Near-unique columns (e.g. free-text ai_theme) would only gain a categories
+    # array as large as the data, so they stay as strings
+    cat_cols = [
+        col for col in dict.fromkeys(cat_cols)
+        if col in df.columns and df[col].nunique() <= 0.5 * df[col].count()
+    ]
+    df[cat_cols] = df[cat_cols].astype('category')
+
+    # Create a unique identifier for each track and index by it, so the song
+    # details page can look a track up directly instead of scanning the frame
+    if 'track_name' in df.columns and 'artist_credit_name' in df.columns:
+        df['display_name'] = df['track_name'].str.cat(df['artist_credit_name'].fillna('Unknown Artist'), sep=' - ')
+        df = df.set_index('display_name', drop=False).rename_axis(None)
+
     return df
 
+# Fingerprint of the code (and pandas version) that produces the prepared frame.
+# It names the Parquet sidecar, so a sidecar written by an older load_data or
+# prepare_data is never served as current
+PREPARED_DATA_KEY = hashlib.sha256(
+    (inspect.getsource(load_data) + inspect.getsource(prepare_data) + pd.__version__).encode()
+).hexdigest()[:12]
+
+# Cached as a resource, so every rerun shares the same frame instead of a fresh
+# copy; the page functions must treat it as read-only
+@st.cache_resource(show_spinner=False)
+def load_and_prepare(file_path, mtime):
+    """Loads and prepares the data once per file version (`mtime` invalidates the cache on change)."""
+    # Reuse the prepared frame from a Parquet sidecar next to the CSV while it is
+    # newer than the CSV, skipping both the CSV parse and the preparation
+    base_path = os.path.splitext(file_path)[0]
+    parquet_path = f"{base_path}.prep-{PREPARED_DATA_KEY}.parquet"
+    if mtime is not None and os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= mtime:
+        try:
+            return pd.read_parquet(parquet_path)
+        except Exception:
+            # An unreadable (e.g. truncated) sidecar is discarded and rebuilt from the CSV
+            with suppress(OSError):
+                os.remove(parquet_path)
+
+    df = prepare_data(load_data(file_path))
+    if not df.empty:
+        # Write to a temporary file and move it into place, so an interrupted
+        # write never leaves a partial sidecar behind
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(parquet_path) or '.', suffix='.parquet.tmp')
+            os.close(fd)
+            df.to_parquet(tmp_path, compression='snappy')
+            os.replace(tmp_path, parquet_path)
+
+            # Sidecars from other code versions (or the old unversioned name) can't be used again
+            stale_paths = [f"{base_path}.parquet"]
+            stale_paths += glob.glob(f"{glob.escape(base_path)}.v*.parquet")
+            stale_paths += glob.glob(f"{glob.escape(base_path)}.prep-*.parquet")
+            for stale_path in stale_paths:
+                if stale_path != parquet_path and os.path.exists(stale_path):
+                    with suppress(OSError):
+                        os.remove(stale_path)
+        except Exception:
+            # The Parquet copy is only an optimization; keep serving the CSV data
+            if tmp_path is not None:
+                with suppress(OSError):
+                    os.remove(tmp_path)
+    return df
+
+@st.cache_data(show_spinner=False)
+def get_dashboard_columns(file_path, mtime):
+    """Returns the (distribution chart, top tracks) columns present in the data, computed once per data file version."""
+    all_cols = load_and_prepare(file_path, mtime).columns.tolist()
+
+    chart_cols = [
+        'super_theme', 
+        'genre_ros', 
+        'timbre', 
+        'danceability',
+        'combined_key'
+    ]
+    chart_cols.extend(col for col in all_cols if col.startswith(('mood_', 'ai_')))
+    chart_cols = sorted(
+        col for col in set(chart_cols)
+        if col in all_cols and col not in ('ai_notes', 'lyrics_text')
+    )
+
+    top_track_cols = ['popularity', 'viewCount', 'likeCount', 'commentCount']
+    top_track_cols = [col for col in top_track_cols if col in all_cols]
+
+    return tuple(chart_cols), tuple(top_track_cols)
+
 # --- 3. Visualization Helper Functions ---
 
-def generate_pie_chart(data, column_name):
-    """Generates a Plotly Pie Chart for a given column."""
-    data_filtered = data.dropna(subset=[column_name])
-    
-    if data_filtered.empty:
-        st.warning(f"No non-empty data available for **{column_name}** to generate a pie chart.")
+def filter_rows(df, filter_column, filter_values):
+    """Returns the rows whose `filter_column` is one of `filter_values` (all rows if none are given)."""
+    if not filter_values:
+        return df
+    if len(filter_values) == 1:
+        # A single value needs a plain comparison, not a set-membership scan
+        return df[df[filter_column] == filter_values[0]]
+    return df[df[filter_column].isin(filter_values)]
+
+@st.cache_data(show_spinner=False)
+def compute_value_counts(file_path, mtime, columns, filter_column=None, filter_values=(), max_slices=15):
+    """Counts the non-empty values of each column over the rows whose `filter_column` is in `filter_values`."""
+    # The frame comes from the cached load_and_prepare, so this cache is keyed on the
+    # filter rather than on a hash of the DataFrame; the rows are filtered once for all columns
+    df = filter_rows(load_and_prepare(file_path, mtime), filter_column, filter_values)
+
+    all_counts = {}
+    for col in columns:
+        if col not in df.columns:
+            # Missing columns are left out of the result
+            continue
+        counts = df[col].value_counts()
+        # Categorical columns also report unused categories; keep only the observed values
+        counts = counts[counts > 0]
+
+        if len(counts) > max_slices:
+            # Collapse everything past the `max_slices` most frequent values into one
+            # 'Other' slice to keep the chart payload small
+            other_total = counts.iloc[max_slices:].sum()
+            counts = counts.iloc[:max_slices]
+            counts = pd.Series(counts.to_numpy(), index=counts.index.astype(str), name=counts.name)
+            counts['Other'] = counts.get('Other', 0) + other_total
+        all_counts[col] = counts
+    return all_counts
+
+def counts_to_frame(counts, column_name, chart_kind):
+    """Turns the value counts of a column into a (value, Count) frame plus its total, warning if there is nothing to chart."""
+    if counts.empty:
+        st.warning(f"No non-empty data available for **{column_name}** to generate a {chart_kind}.")
+        return None, 0
+
+    value_counts = counts.reset_index()
+    value_counts.columns = [column_name, 'Count']
+    return value_counts, value_counts['Count'].sum()
+
+def generate_pie_chart(counts, column_name):
+    """Generates a Plotly Pie Chart from the precomputed value counts of a column."""
+    value_counts, total = counts_to_frame(counts, column_name, 'pie chart')
+    if value_counts is None:
         return
 
-    value_counts = data_filtered[column_name].value_counts().reset_index()
-    value_counts.columns = [column_name, 'Count']
-    total = value_counts['Count'].sum()
-
-    fig = px.pie(
-        value_counts, 
-        values='Count', 
-        names=column_name, 
-        title=f'Distribution of **{column_name}** (N={total})',
-        hole=0.3, 
-        color_discrete_sequence=px.colors.qualitative.D3
-    )
-    
-    fig.update_traces(
-        textinfo='percent+label',
-        hovertemplate='%{label}: %{value} entries (<extra>%{percent}</extra>)'
+    # Build the trace directly rather than through plotly.express's figure factory
+    fig = go.Figure(
+        go.Pie(
+            labels=value_counts[column_name],
+            values=value_counts['Count'],
+            hole=0.3,
+            textinfo='percent+label',
+            hovertemplate='%{label}: %{value} entries (<extra>%{percent}</extra>)'
+        ),
+        layout=PIE_LAYOUT
     )
+    fig.update_layout(title=f'Distribution of **{column_name}** (N={total})')
     
     st.plotly_chart(fig, use_container_width=True)
 
-def generate_top_tracks_table(data, sort_column):
-    """Generates a table of the top 50 tracks based on a count column."""
-    data_filtered = data.dropna(subset=[sort_column])
-    
-    if data_filtered.empty:
-        st.warning(f"No non-empty data available for **{sort_column}** to generate the table.")
+def generate_bar_chart(counts, column_name):
+    """Generates a lightweight Streamlit bar chart from the precomputed value counts of a column."""
+    value_counts, total = counts_to_frame(counts, column_name, 'bar chart')
+    if value_counts is None:
         return
 
+    value_counts[column_name] = value_counts[column_name].astype(str)
+
+    st.markdown(f"Distribution of **{column_name}** (N={total})")
+    # Keep the frequency order from the counts (with any 'Other' bucket last)
+    st.bar_chart(value_counts, x=column_name, y='Count', horizontal=True, sort=False)
+
+@st.cache_data(show_spinner=False)
+def compute_top_tracks(file_path, mtime, sort_column, filter_column=None, filter_values=()):
+    """Returns the top 50 tracks by a count column over the rows whose `filter_column` is in `filter_values`."""
+    df = filter_rows(load_and_prepare(file_path, mtime), filter_column, filter_values)
+
     display_cols = ['track_name', 'artist_credit_name', 'album_title', sort_column]
-    final_cols = [col for col in display_cols if col in data_filtered.columns]
-    
-    top_tracks = data_filtered[final_cols] \
-        .sort_values(by=sort_column, ascending=False) \
-        .head(50) \
+    final_cols = [col for col in display_cols if col in df.columns]
+
+    # nlargest only partially sorts; empty values are dropped first since it would
+    # otherwise pad the result with them when fewer than 50 tracks have a value
+    return df[final_cols] \
+        .dropna(subset=[sort_column]) \
+        .nlargest(50, sort_column) \
         .reset_index(drop=True)
 
+def generate_top_tracks_table(top_tracks, sort_column):
+    """Generates a table of the top 50 tracks based on a count column."""
+    if top_tracks.empty:
+        st.warning(f"No non-empty data available for **{sort_column}** to generate the table.")
+        return
+
     st.subheader(f"🏆 Top 50 Tracks by **{sort_column}**")
     
+    # Format the counts through column_config rather than a pandas Styler, which
+    # Streamlit serializes cell by cell; the column stays numeric for sorting
     st.dataframe(
-        top_tracks.style.format({
-            sort_column: "{:,.0f}" 
-        }), 
+        top_tracks, 
         use_container_width=True, 
-        height=750
+        height=750,
+        column_config={sort_column: st.column_config.NumberColumn(format="localized")}
     )
 
+@st.cache_data(show_spinner=False)
+def get_sorted_display_names(file_path, mtime):
+    """Returns the sorted unique track display names, computed once per data file version."""
+    df = load_and_prepare(file_path, mtime)
+    return tuple(sorted(df['display_name'].dropna().unique()))
+
 # --- 4. New Album Dashboard Function ---
-def show_new_album_dashboard(df):
+def show_new_album_dashboard(df, file_path, mtime):
     """Displays a detailed dashboard for the '屬於' album."""
     ALBUM_NAME = "屬於"
     
@@ -139,7 +300,7 @@ def show_new_album_dashboard(df):
         st.error("Error: Album consolidation failed. Cannot filter by consolidated title.")
         return
 
-    df_album = df[df['consolidated_album_title'] == ALBUM_NAME].copy()
+    df_album = df[df['consolidated_album_title'] == ALBUM_NAME]
 
     if df_album.empty:
         st.warning(f"Album '{ALBUM_NAME}' not found in the dataset after consolidation.")
@@ -152,9 +313,14 @@ def show_new_album_dashboard(df):
     st.markdown("### Album Track Listing & Features")
     track_list_cols = ['track_name', 'artist_credit_name', 'popularity', 'viewCount', 'ai_sentiment', 'combined_key']
     
+    # The counts are stored as floats; show them as whole numbers
     st.dataframe(
         df_album[track_list_cols].sort_values(by='popularity', ascending=False).reset_index(drop=True),
-        use_container_width=True
+        use_container_width=True,
+        column_config={
+            'popularity': st.column_config.NumberColumn(format="%d"),
+            'viewCount': st.column_config.NumberColumn(format="%d")
+        }
     )
     
     st.markdown("---")
@@ -164,32 +330,44 @@ def show_new_album_dashboard(df):
     
     detail_cols = ['normalized_key', 'mood_sad', 'ai_theme', 'genre_ros']
     
+    all_counts = compute_value_counts(file_path, mtime, tuple(detail_cols), 'consolidated_album_title', (ALBUM_NAME,))
+
     cols = st.columns(2)
     for i, col_name in enumerate(detail_cols):
-        try:
-            with cols[i % 2]:
-                generate_pie_chart(df_album, col_name)
-        except KeyError:
-             st.warning(f"Column '{col_name}' missing from the dataset.")
+        if col_name not in all_counts:
+            st.warning(f"Column '{col_name}' missing from the dataset.")
+            continue
+        with cols[i % 2]:
+            generate_pie_chart(all_counts[col_name], col_name)
 
 # --- 5. Song Details Page Function (RESTORED/REFINED) ---
-def show_song_details(df):
+def show_song_details(df, file_path, mtime):
     """Allows selection of a song and displays its full details."""
     st.title("🔍 Individual Song Details")
-    
-    # Create a unique identifier for each track for the selection box
-    df['display_name'] = df['track_name'] + ' - ' + df['artist_credit_name'].fillna('Unknown Artist')
-    
+    MAX_OPTIONS = 200
+
+    # Narrow the song list with a search box so the selection box is never sent
+    # more than MAX_OPTIONS names
+    display_names = get_sorted_display_names(file_path, mtime)
+    search_query = st.text_input("Search Songs (title or artist):").strip().lower()
+    if search_query:
+        display_names = [name for name in display_names if search_query in name.lower()]
+
+    if len(display_names) > MAX_OPTIONS:
+        st.caption(f"Showing the first {MAX_OPTIONS} of {len(display_names)} matching songs. Refine the search to see more.")
+
     # Allow selection
     selected_track_name = st.selectbox(
         "Select a Song to View Full Details:", 
-        options=sorted(df['display_name'].unique())
+        options=display_names[:MAX_OPTIONS]
     )
 
     if selected_track_name:
-        # Filter the DataFrame to the selected song
-        # Use .copy() to avoid SettingWithCopyWarning if further changes were needed
-        selected_row = df[df['display_name'] == selected_track_name].iloc[0]
+        # Look up the selected song by its display name (the frame's index)
+        selected_row = df.loc[selected_track_name]
+        if isinstance(selected_row, pd.DataFrame):
+            # Duplicate display names: keep the first match
+            selected_row = selected_row.iloc[0]
         
         st.markdown("---")
         
@@ -205,6 +383,10 @@ def show_song_details(df):
         
         # Filter to only show non-null values for a clean view
         details_df = details_df.dropna(subset=['Value'])
+
+        # The counts are stored as floats; show them without a trailing '.0'
+        count_rows = details_df['Feature'].isin(['viewCount', 'likeCount', 'commentCount', 'popularity'])
+        details_df.loc[count_rows, 'Value'] = details_df.loc[count_rows, 'Value'].map(int)
         
         # Display the details table
         st.dataframe(
@@ -216,43 +398,45 @@ def show_song_details(df):
 
 
 # --- 6. Dashboard Page Function ---
-def show_dashboard(df_filtered):
+def show_dashboard(df_filtered, selected_keys, file_path, mtime):
     """Displays the main visualization dashboard."""
     
     st.header(f"General Dashboard (Analyzing {len(df_filtered)} rows)")
     st.markdown("---")
     
     
-    # --- PIE CHARTS SECTION ---
-    st.header("Pie Chart Analysis: Categorical Features")
-    
-    pie_chart_cols = [
-        'super_theme', 
-        'genre_ros', 
-        'timbre', 
-        'danceability',
-        'combined_key'
-    ]
-    
-    all_cols = df_filtered.columns.tolist()
-    mood_cols = [col for col in all_cols if col.startswith('mood_')]
-    ai_cols = [col for col in all_cols if col.startswith('ai_')]
-    
-    pie_chart_cols.extend(mood_cols)
-    pie_chart_cols.extend(ai_cols)
+    # --- DISTRIBUTION CHARTS SECTION ---
+    st.header("Distribution Analysis: Categorical Features")
     
-    pie_chart_cols = sorted(list(set(pie_chart_cols)))
-    if 'ai_notes' in pie_chart_cols: pie_chart_cols.remove('ai_notes')
-    if 'lyrics_text' in pie_chart_cols: pie_chart_cols.remove('lyrics_text')
+    chart_cols, top_track_cols = get_dashboard_columns(file_path, mtime)
+
+    # Aggregate every chart in one pass before building any figures
+    all_counts = compute_value_counts(file_path, mtime, chart_cols, 'combined_key', selected_keys)
+
+    # Group the charts by feature family and only build the figures of the
+    # selected group, instead of every chart on each render. The dense mood_/ai_
+    # groups use native bar charts, which skip Plotly's figure and payload cost
+    chart_groups = {
+        'General': [col for col in chart_cols if not col.startswith(('mood_', 'ai_'))],
+        'Mood': [col for col in chart_cols if col.startswith('mood_')],
+        'AI Analysis': [col for col in chart_cols if col.startswith('ai_')],
+    }
+    chart_groups = {group: group_cols for group, group_cols in chart_groups.items() if group_cols}
+
+    selected_group = st.selectbox(
+        "Chart Group:",
+        options=list(chart_groups),
+        format_func=lambda group: f"{group} ({len(chart_groups[group])} features)"
+    )
 
     num_cols = 3
     cols = st.columns(num_cols)
-    for i, col_name in enumerate(pie_chart_cols):
-        try:
-            with cols[i % num_cols]:
-                generate_pie_chart(df_filtered, col_name)
-        except KeyError:
-            st.warning(f"Column '{col_name}' missing from the dataset.")
+    for i, col_name in enumerate(chart_groups.get(selected_group, [])):
+        with cols[i % num_cols]:
+            if col_name.startswith(('mood_', 'ai_')):
+                generate_bar_chart(all_counts[col_name], col_name)
+            else:
+                generate_pie_chart(all_counts[col_name], col_name)
 
     st.markdown("---")
 
@@ -260,17 +444,13 @@ def show_dashboard(df_filtered):
     # --- TOP TRACKS TABLES SECTION ---
     st.header("Top 50 Tracks: Quantitative Measures")
     
-    top_track_cols = ['popularity', 'viewCount', 'likeCount', 'commentCount']
-    
     num_cols_tables = 2
     table_cols = st.columns(num_cols_tables)
     
     for i, col_name in enumerate(top_track_cols):
-        try:
-            with table_cols[i % num_cols_tables]:
-                generate_top_tracks_table(df_filtered, col_name)
-        except KeyError:
-             st.warning(f"Column '{col_name}' missing from the dataset.")
+        with table_cols[i % num_cols_tables]:
+            top_tracks = compute_top_tracks(file_path, mtime, col_name, 'combined_key', selected_keys)
+            generate_top_tracks_table(top_tracks, col_name)
 
 
 # --- 7. Main App Logic ---
@@ -280,8 +460,8 @@ def main():
 
     # Load and Prepare Data (Consolidation happens here)
     FILE_NAME = 'final_modified_tracks.csv'
-    df = load_data(FILE_NAME)
-    df = prepare_data(df)
+    mtime = os.path.getmtime(FILE_NAME) if os.path.exists(FILE_NAME) else None
+    df = load_and_prepare(FILE_NAME, mtime)
 
     if df.empty:
         return
@@ -290,7 +470,12 @@ def main():
     st.sidebar.header("Data Filters (Applies to Dashboard)")
     
     # Filter for Combined Key
-    available_keys = df['combined_key'].dropna().unique() if 'combined_key' in df.columns else []
+    available_keys = ()
+    if 'combined_key' in df.columns:
+        if isinstance(df['combined_key'].dtype, pd.CategoricalDtype):
+            available_keys = tuple(df['combined_key'].cat.categories)
+        else:
+            available_keys = tuple(sorted(df['combined_key'].dropna().unique()))
     selected_keys = st.sidebar.multiselect(
         "Filter by Combined Key", 
         options=available_keys, 
@@ -299,20 +484,20 @@ def main():
 
     df_filtered = df
     if selected_keys:
-        df_filtered = df[df['combined_key'].isin(selected_keys)]
+        df_filtered = filter_rows(df, 'combined_key', selected_keys)
         st.sidebar.info(f"Filtered to **{len(df_filtered)}** rows based on Combined Key selection.")
 
     # --- Tabbed Interface ---
     tab_dashboard, tab_album, tab_details = st.tabs(["📊 Main Dashboard", "💿 New Album: 屬於", "🎵 Song Details"])
 
     with tab_dashboard:
-        show_dashboard(df_filtered)
+        show_dashboard(df_filtered, tuple(sorted(selected_keys)), FILE_NAME, mtime)
 
     with tab_album:
-        show_new_album_dashboard(df) # Use the full DF for album specific analysis
+        show_new_album_dashboard(df, FILE_NAME, mtime) # Use the full DF for album specific analysis
 
     with tab_details:
-        show_song_details(df) # <-- THIS FUNCTION IS NOW DEFINED ABOVE
+        show_song_details(df, FILE_NAME, mtime) # <-- THIS FUNCTION IS NOW DEFINED ABOVE
 
 
 if __name__ == "__main__":